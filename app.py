@@ -1,9 +1,11 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 import gspread
+from gspread.utils import rowcol_to_a1
 from google.oauth2.service_account import Credentials
 
 # Page config
@@ -37,6 +39,14 @@ st.markdown("""
 
 # Configuration
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+PLOTLY_CONFIG = {'responsive': True, 'staticPlot': False}
+TIMELINE_MAX_TASKS = 500
+TASKS_PAGE_SIZE = 50
+
+# Sheet columns used by the app; anything else in the sheet is not downloaded
+SHEET_COLUMNS = ['PROJECT', 'TASK_ID', 'TASK_NAME', 'TYPE', 'STATUS', 'PRIORITY', 'PROGRESS',
+                 'START_DATE', 'END_DATE', 'BUDGET', 'ACTUAL_COST', 'ASSIGNED_TO']
+AMOUNT_COLUMNS = ('BUDGET', 'ACTUAL_COST')
 
 @st.cache_resource
 def get_google_sheet_connection():
@@ -53,6 +63,38 @@ def get_google_sheet_connection():
         st.error(f"Connection error: {e}")
         return None
 
+@st.cache_resource
+def get_worksheet():
+    """Open the project worksheet once and reuse the handle"""
+    client = get_google_sheet_connection()
+    if not client:
+        return None
+    return client.open_by_url(str(st.secrets.get("sheet_url", ""))).sheet1
+
+@st.cache_data(ttl=300)
+def get_sheet_header():
+    """Column names from the first row of the worksheet"""
+    sheet = get_worksheet()
+    if sheet is None:
+        return []
+    return sheet.row_values(1)
+
+def fetch_columns(sheet, header, names, **kwargs):
+    """Fetch whole data columns by name in one batch_get call"""
+    if not names:
+        return {}
+    
+    ranges = []
+    for name in names:
+        letter = rowcol_to_a1(1, header.index(name) + 1)[:-1]
+        ranges.append(f"{letter}2:{letter}")
+    
+    # Empty cells come back as empty rows and trailing blanks are trimmed
+    return {
+        name: [row[0] if row else '' for row in values]
+        for name, values in zip(names, sheet.batch_get(ranges, **kwargs))
+    }
+
 @st.cache_data(ttl=300)  # Cache for 5 minutes
 def load_data():
     """Load data from Google Sheets"""
@@ -64,102 +106,165 @@ def load_data():
     st.write("Has gcp_service_account:", "gcp_service_account" in st.secrets)
     
     try:
-        client = get_google_sheet_connection()
-        if not client:
+        sheet = get_worksheet()
+        if sheet is None:
+            return pd.DataFrame()
+        
+        # Fetch only the columns the app uses
+        header = get_sheet_header()
+        names = [col for col in SHEET_COLUMNS if col in header]
+        if not names:
             return pd.DataFrame()
         
-        sheet = client.open_by_url(str(st.secrets.get("sheet_url", ""))).sheet1
-        data = sheet.get_all_records()
-        df = pd.DataFrame(data)
+        # Amounts unformatted so cells shown as "1,000" or "$1,500" arrive as numbers
+        columns = fetch_columns(sheet, header, [col for col in names if col not in AMOUNT_COLUMNS])
+        columns.update(fetch_columns(sheet, header, [col for col in names if col in AMOUNT_COLUMNS],
+                                     value_render_option='UNFORMATTED_VALUE'))
+        n_rows = max(len(col) for col in columns.values())
+        df = pd.DataFrame({
+            name: columns[name] + [''] * (n_rows - len(columns[name]))
+            for name in names
+        })
         
         # Clean data
         if not df.empty:
-            df['PROGRESS_NUM'] = df['PROGRESS'].astype(str).str.rstrip('%').astype(float)
-            df['START'] = pd.to_datetime(df['START_DATE'], format='%d/%m/%Y', errors='coerce')
-            df['END'] = pd.to_datetime(df['END_DATE'], format='%d/%m/%Y', errors='coerce')
+            # Free-text columns as Arrow-backed strings
+            for col in ('TASK_ID', 'TASK_NAME', 'ASSIGNED_TO', 'PROGRESS', 'START_DATE', 'END_DATE'):
+                if col in df:
+                    df[col] = df[col].astype('string[pyarrow]')
+            
+            # Narrow numeric dtypes - int32 only for complete, whole, in-range amounts
+            for col in AMOUNT_COLUMNS:
+                if col in df:
+                    values = pd.to_numeric(df[col], errors='coerce')
+                    invalid = values.isna() & (df[col] != '')
+                    if invalid.any():
+                        rows = ', '.join(str(i + 2) for i in df.index[invalid])
+                        st.warning(f"Non-numeric {col} values ignored in sheet rows: {rows}")
+                    fits_int32 = (
+                        values.notna().all()
+                        and (values % 1 == 0).all()
+                        and values.abs().max() <= np.iinfo('int32').max
+                    )
+                    df[col] = values.astype('int32') if fits_int32 else values.astype('float64')
+            df['PROGRESS_NUM'] = pd.to_numeric(
+                df['PROGRESS'].str.removesuffix('%'), errors='coerce'
+            ).astype('float32')
+            df['START'] = pd.to_datetime(df['START_DATE'], format='%d/%m/%Y', errors='coerce', cache=True)
+            df['END'] = pd.to_datetime(df['END_DATE'], format='%d/%m/%Y', errors='coerce', cache=True)
+            
+            # Low-cardinality labels - categorical codes make filters and groupby cheaper
+            for col in ('PROJECT', 'STATUS', 'TYPE', 'PRIORITY'):
+                df[col] = df[col].astype('category')
         
         return df
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return pd.DataFrame()
 
-def save_data(df):
-    """Save data back to Google Sheets"""
+def save_task_updates(task_id, updates):
+    """Write only the changed cells of one task back to Google Sheets"""
     try:
-        client = get_google_sheet_connection()
-        if not client:
+        sheet = get_worksheet()
+        if sheet is None:
             return False
         
-        sheet = client.open_by_url(st.secrets["sheet_url"]).sheet1
+        # Read the header fresh - a cached copy could point writes at the wrong column
+        header = sheet.row_values(1)
+        missing = [col for col in ['TASK_ID', *updates] if col not in header]
+        if missing:
+            st.error(f"Column not found in sheet: {', '.join(missing)}")
+            return False
         
-        # Prepare data for upload
-        df_upload = df.copy()
-        df_upload['PROGRESS'] = df_upload['PROGRESS_NUM'].astype(str) + '%'
-        df_upload = df_upload.drop(columns=['PROGRESS_NUM', 'START', 'END'], errors='ignore')
+        cell = sheet.find(str(task_id), in_column=header.index('TASK_ID') + 1)
+        if cell is None:
+            st.error(f"Task {task_id} not found in sheet")
+            return False
         
-        # Clear and update
-        sheet.clear()
-        sheet.update([df_upload.columns.values.tolist()] + df_upload.values.tolist())
+        sheet.batch_update([
+            {
+                'range': rowcol_to_a1(cell.row, header.index(col) + 1),
+                'values': [[value]]
+            }
+            for col, value in updates.items()
+        ])
         return True
     except Exception as e:
         st.error(f"Error saving: {e}")
         return False
 
-def create_timeline_chart(df):
-    """Create Gantt chart timeline"""
+@st.cache_data(ttl=300, max_entries=16)
+def to_csv_bytes(df):
+    """CSV export of the given tasks"""
+    return df.to_csv(index=False).encode('utf-8')
+
+def get_filter_options(df):
+    """Sidebar filter choices, read from the categorical dtypes set in load_data()"""
+    return {col: df[col].cat.categories.tolist() for col in ('PROJECT', 'TYPE', 'STATUS')}
+
+@st.cache_data(ttl=300, max_entries=16)
+def create_timeline_chart(df, max_tasks=TIMELINE_MAX_TASKS):
+    """Create Gantt chart timeline, limited to the earliest max_tasks tasks"""
     if df.empty or df['START'].isna().all():
-        st.info("No timeline data available")
         return None
     
     df_valid = df.dropna(subset=['START', 'END'])
+    if len(df_valid) > max_tasks:
+        df_valid = df_valid.nsmallest(max_tasks, 'START')
     
     fig = go.Figure()
     
     colors = {'Villa 5': '#3B82F6', 'Villa 6': '#10B981'}
     
+    # Labels, durations and hover text for all tasks in one vectorized pass
+    df_valid = df_valid.sort_values('START')
+    names = df_valid['TASK_NAME'].astype(str)
+    progress = df_valid['PROGRESS'].astype(str)
+    labels = df_valid['PROJECT'].astype(str) + ": " + names.str[:40]
+    durations = (df_valid['END'] - df_valid['START']).dt.total_seconds() * 1000
+    hover = ("<b>" + names + "</b><br>" +
+             "Start: " + df_valid['START'].dt.strftime('%d/%m/%Y') + "<br>" +
+             "End: " + df_valid['END'].dt.strftime('%d/%m/%Y') + "<br>" +
+             "Progress: " + progress)
+    
     for project in df_valid['PROJECT'].unique():
-        project_df = df_valid[df_valid['PROJECT'] == project].sort_values('START')
+        in_project = df_valid['PROJECT'] == project
         
-        for _, task in project_df.iterrows():
-            fig.add_trace(go.Bar(
-                name=task['TASK_NAME'],
-                x=[task['END'] - task['START']],
-                y=[f"{task['PROJECT']}: {task['TASK_NAME'][:40]}"],
-                base=task['START'],
-                orientation='h',
-                marker_color=colors.get(project, '#6B7280'),
-                text=f"{task['PROGRESS']}",
-                textposition='inside',
-                hovertemplate=f"<b>{task['TASK_NAME']}</b><br>" +
-                             f"Start: {task['START'].strftime('%d/%m/%Y')}<br>" +
-                             f"End: {task['END'].strftime('%d/%m/%Y')}<br>" +
-                             f"Progress: {task['PROGRESS']}<br>" +
-                             f"<extra></extra>",
-                showlegend=False
-            ))
+        fig.add_trace(go.Bar(
+            name=project,
+            x=durations[in_project].to_numpy(),
+            y=labels[in_project].tolist(),
+            base=df_valid.loc[in_project, 'START'],
+            orientation='h',
+            marker_color=colors.get(project, '#6B7280'),
+            text=progress[in_project].tolist(),
+            textposition='inside',
+            hovertemplate=None,
+            hovertext=hover[in_project].tolist(),
+            hoverinfo='text',
+            showlegend=False
+        ))
     
     fig.update_layout(
         title="Project Timeline",
         xaxis_title="Date",
+        xaxis_type='date',
         height=max(400, len(df_valid) * 30),
         barmode='overlay',
-        hovermode='closest'
+        hovermode='closest',
+        uirevision='timeline'
     )
     
     return fig
 
-def create_budget_chart(df):
-    """Budget comparison"""
-    budget_data = df.groupby('PROJECT').agg({
-        'BUDGET': 'sum',
-        'ACTUAL_COST': 'sum'
-    }).reset_index()
-    
+@st.cache_data(ttl=300, max_entries=16)
+def create_budget_chart(agg):
+    """Budget comparison from per-project aggregates"""
     fig = go.Figure(data=[
-        go.Bar(name='Budget', x=budget_data['PROJECT'], y=budget_data['BUDGET'], 
-               marker_color='#3B82F6', text=budget_data['BUDGET'], textposition='outside'),
-        go.Bar(name='Spent', x=budget_data['PROJECT'], y=budget_data['ACTUAL_COST'], 
-               marker_color='#EF4444', text=budget_data['ACTUAL_COST'], textposition='outside')
+        go.Bar(name='Budget', x=agg.index, y=agg['budget'], 
+               marker_color='#3B82F6', text=agg['budget'], textposition='outside'),
+        go.Bar(name='Spent', x=agg.index, y=agg['spent'], 
+               marker_color='#EF4444', text=agg['spent'], textposition='outside')
     ])
     
     fig.update_layout(
@@ -167,21 +272,21 @@ def create_budget_chart(df):
         barmode='group',
         height=400,
         yaxis_title='Amount ($)',
-        hovermode='x unified'
+        hovermode='x unified',
+        uirevision='budget'
     )
     
     return fig
 
-def create_progress_chart(df):
-    """Progress by project"""
-    progress_data = df.groupby('PROJECT')['PROGRESS_NUM'].mean().reset_index()
-    
+@st.cache_data(ttl=300, max_entries=16)
+def create_progress_chart(agg):
+    """Progress by project from per-project aggregates"""
     fig = go.Figure(data=[
         go.Bar(
-            x=progress_data['PROJECT'],
-            y=progress_data['PROGRESS_NUM'],
+            x=agg.index,
+            y=agg['progress'],
             marker_color='#10B981',
-            text=progress_data['PROGRESS_NUM'].round(1).astype(str) + '%',
+            text=agg['progress'].round(1).astype(str) + '%',
             textposition='outside'
         )
     ])
@@ -190,24 +295,25 @@ def create_progress_chart(df):
         title='Overall Progress by Project',
         yaxis_range=[0, 110],
         yaxis_title='Progress (%)',
-        height=400
+        height=400,
+        uirevision='progress'
     )
     
     return fig
 
-def create_status_chart(df):
-    """Task status distribution"""
-    status_counts = df.groupby(['PROJECT', 'STATUS']).size().reset_index(name='count')
-    
+@st.cache_data(ttl=300, max_entries=16)
+def create_status_chart(status_counts):
+    """Task status distribution from a project x status count table"""
     fig = go.Figure()
     
-    for project in status_counts['PROJECT'].unique():
-        project_data = status_counts[status_counts['PROJECT'] == project]
+    for project in status_counts.index:
+        counts = status_counts.loc[project]
+        counts = counts[counts > 0]
         fig.add_trace(go.Bar(
             name=project,
-            x=project_data['STATUS'],
-            y=project_data['count'],
-            text=project_data['count'],
+            x=counts.index,
+            y=counts.values,
+            text=counts.values,
             textposition='outside'
         ))
     
@@ -215,11 +321,113 @@ def create_status_chart(df):
         title='Task Status by Project',
         barmode='group',
         height=400,
-        yaxis_title='Number of Tasks'
+        yaxis_title='Number of Tasks',
+        uirevision='status'
     )
     
     return fig
 
+@st.fragment
+def update_tab(df, role):
+    """Progress and cost update forms, rerun on their own as a fragment"""
+    task_name_map = dict(zip(df['TASK_ID'], df['TASK_NAME']))
+    
+    if role in ["Project Manager", "Site Manager", "Assistant"]:
+        st.markdown("### Update Task Progress")
+        
+        col1, col2 = st.columns([2, 1])
+        
+        with col1:
+            task_options = df['TASK_ID'].tolist()
+            selected_task = st.selectbox(
+                "Select Task",
+                task_options,
+                format_func=lambda x: f"{x} - {task_name_map[x]}"
+            )
+        
+        with col2:
+            new_progress = st.slider("New Progress (%)", 0, 100, 0, 5)
+        
+        if st.button("Update Progress", type="primary"):
+            updates = {'PROGRESS': f"{new_progress}%"}
+            
+            if new_progress == 100:
+                updates['STATUS'] = 'Complete'
+            elif new_progress > 0:
+                updates['STATUS'] = 'In Progress'
+            
+            if save_task_updates(selected_task, updates):
+                st.success(f"Updated {selected_task} to {new_progress}%!")
+                st.cache_data.clear()
+                st.rerun()
+    
+    if role in ["Project Manager", "Purchaser", "Assistant"]:
+        st.markdown("---")
+        st.markdown("### Update Actual Cost")
+        
+        col1, col2 = st.columns([2, 1])
+        
+        with col1:
+            cost_task = st.selectbox(
+                "Select Task for Cost",
+                df['TASK_ID'].tolist(),
+                format_func=lambda x: f"{x} - {task_name_map[x]}",
+                key="cost_task"
+            )
+        
+        with col2:
+            new_cost = st.number_input("Actual Cost ($)", min_value=0, step=1000)
+        
+        if st.button("Update Cost", type="primary"):
+            if save_task_updates(cost_task, {'ACTUAL_COST': new_cost}):
+                st.success(f"Updated cost for {cost_task}!")
+                st.cache_data.clear()
+                st.rerun()
+
+@st.fragment
+def report_tab(df, role, villa_agg, villa_status):
+    """Weekly report generator, reruns on its own as a fragment"""
+    if role in ["Project Manager", "Assistant"]:
+        st.markdown("### Weekly Report")
+        
+        if st.button("Generate Report", type="primary"):
+            report = f"""
+# Weekly Project Report
+**Generated:** {datetime.now().strftime('%d/%m/%Y %H:%M')}
+
+## Villa 5
+- **Progress:** {villa_agg.loc['Villa 5', 'progress']:.1f}%
+- **Completed:** {villa_status.loc['Villa 5', 'Complete']} tasks
+- **In Progress:** {villa_status.loc['Villa 5', 'In Progress']} tasks
+- **Budget:** ${villa_agg.loc['Villa 5', 'budget']:,.0f}
+- **Spent:** ${villa_agg.loc['Villa 5', 'spent']:,.0f}
+
+## Villa 6
+- **Progress:** {villa_agg.loc['Villa 6', 'progress']:.1f}%
+- **Completed:** {villa_status.loc['Villa 6', 'Complete']} tasks
+- **In Progress:** {villa_status.loc['Villa 6', 'In Progress']} tasks
+- **Budget:** ${villa_agg.loc['Villa 6', 'budget']:,.0f}
+- **Spent:** ${villa_agg.loc['Villa 6', 'spent']:,.0f}
+
+## Critical Tasks
+"""
+            critical = df[(df['PRIORITY'].isin(['Critical', 'High'])) & (df['STATUS'] != 'Complete')]
+            lines = ("- **" + critical['PROJECT'].astype(str) + ":** " +
+                     critical['TASK_NAME'].astype(str) + " (" +
+                     critical['PROGRESS'].astype(str) + ")").tolist()
+            if lines:
+                report += "\n".join(lines) + "\n"
+            
+            st.markdown(report)
+            
+            # Download report
+            st.download_button(
+                "📥 Download Report",
+                report,
+                file_name=f"weekly_report_{datetime.now().strftime('%Y%m%d')}.md",
+                mime="text/markdown"
+            )
+
 def main():
     # Sidebar
     with st.sidebar:
@@ -243,62 +451,68 @@ def main():
         st.markdown("---")
         st.markdown("### Filters")
         
-        # Load data for filters
+        # Load data once per run - reused below for the main content
         df = load_data()
         
         if not df.empty:
+            filter_options = get_filter_options(df)
+            
             project_filter = st.selectbox(
                 "Project",
-                ["All"] + df['PROJECT'].unique().tolist()
+                ["All"] + filter_options['PROJECT']
             )
             
             type_filter = st.multiselect(
                 "Task Type",
-                df['TYPE'].unique().tolist(),
-                default=df['TYPE'].unique().tolist()
+                filter_options['TYPE'],
+                default=filter_options['TYPE']
             )
             
             status_filter = st.multiselect(
                 "Status",
-                df['STATUS'].unique().tolist(),
-                default=df['STATUS'].unique().tolist()
+                filter_options['STATUS'],
+                default=filter_options['STATUS']
             )
     
     # Main content
     st.markdown('<p class="main-header">🏗️ Villa 5 & Villa 6 Project Manager</p>', unsafe_allow_html=True)
     
-    # Load and filter data
-    df = load_data()
-    
     if df.empty:
         st.error("No data loaded. Check your Google Sheets connection in Streamlit secrets.")
         st.stop()
     
     # Apply filters
+    mask = df['TYPE'].isin(type_filter) & df['STATUS'].isin(status_filter)
     if project_filter != "All":
-        df = df[df['PROJECT'] == project_filter]
-    df = df[df['TYPE'].isin(type_filter)]
-    df = df[df['STATUS'].isin(status_filter)]
+        mask &= df['PROJECT'] == project_filter
+    df = df.loc[mask]
+    
+    # Per-project aggregates shared by metrics, charts and reports
+    agg = df.groupby('PROJECT', observed=True, sort=False).agg(
+        progress=('PROGRESS_NUM', 'mean'),
+        budget=('BUDGET', 'sum'),
+        spent=('ACTUAL_COST', 'sum')
+    )
+    status_counts = df.groupby(['PROJECT', 'STATUS'], observed=True).size().unstack(fill_value=0)
+    
+    villas = ['Villa 5', 'Villa 6']
+    villa_agg = agg.reindex(villas).fillna(0)
+    villa_status = status_counts.reindex(index=villas, columns=['Complete', 'In Progress'], fill_value=0)
     
     # Key metrics
     col1, col2, col3, col4 = st.columns(4)
     
-    villa5 = df[df['PROJECT'] == 'Villa 5']
-    villa6 = df[df['PROJECT'] == 'Villa 6']
-    
     with col1:
-        v5_progress = villa5['PROGRESS_NUM'].mean() if len(villa5) > 0 else 0
-        st.metric("Villa 5 Progress", f"{v5_progress:.1f}%", 
-                 delta=f"{len(villa5[villa5['STATUS']=='Complete'])} tasks done")
+        st.metric("Villa 5 Progress", f"{villa_agg.loc['Villa 5', 'progress']:.1f}%", 
+                 delta=f"{villa_status.loc['Villa 5', 'Complete']} tasks done")
     
     with col2:
-        v6_progress = villa6['PROGRESS_NUM'].mean() if len(villa6) > 0 else 0
-        st.metric("Villa 6 Progress", f"{v6_progress:.1f}%",
-                 delta=f"{len(villa6[villa6['STATUS']=='Complete'])} tasks done")
+        st.metric("Villa 6 Progress", f"{villa_agg.loc['Villa 6', 'progress']:.1f}%",
+                 delta=f"{villa_status.loc['Villa 6', 'Complete']} tasks done")
     
     with col3:
-        total_budget = df['BUDGET'].sum()
-        total_spent = df['ACTUAL_COST'].sum()
+        total_budget = agg['budget'].sum()
+        total_spent = agg['spent'].sum()
         st.metric("Total Budget", f"${total_budget:,.0f}",
                  delta=f"${total_spent:,.0f} spent")
     
@@ -316,76 +530,29 @@ def main():
         col1, col2 = st.columns(2)
         
         with col1:
-            fig = create_progress_chart(df)
-            st.plotly_chart(fig, use_container_width=True)
+            fig = create_progress_chart(agg)
+            st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
             
-            fig = create_budget_chart(df)
-            st.plotly_chart(fig, use_container_width=True)
+            fig = create_budget_chart(agg)
+            st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
         
         with col2:
-            fig = create_status_chart(df)
-            st.plotly_chart(fig, use_container_width=True)
+            fig = create_status_chart(status_counts)
+            st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
         
         st.markdown("### Timeline")
         fig = create_timeline_chart(df)
         if fig:
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG)
+            timeline_tasks = df[['START', 'END']].notna().all(axis=1).sum()
+            if timeline_tasks > TIMELINE_MAX_TASKS:
+                st.caption(f"Showing the first {TIMELINE_MAX_TASKS} of {timeline_tasks} tasks. "
+                           "Use the filters to narrow the timeline.")
+        else:
+            st.info("No timeline data available")
     
     with tab2:
-        if role in ["Project Manager", "Site Manager", "Assistant"]:
-            st.markdown("### Update Task Progress")
-            
-            col1, col2 = st.columns([2, 1])
-            
-            with col1:
-                task_options = df['TASK_ID'].tolist()
-                selected_task = st.selectbox(
-                    "Select Task",
-                    task_options,
-                    format_func=lambda x: f"{x} - {df[df['TASK_ID']==x]['TASK_NAME'].values[0]}"
-                )
-            
-            with col2:
-                new_progress = st.slider("New Progress (%)", 0, 100, 0, 5)
-            
-            if st.button("Update Progress", type="primary"):
-                df.loc[df['TASK_ID'] == selected_task, 'PROGRESS_NUM'] = new_progress
-                df.loc[df['TASK_ID'] == selected_task, 'PROGRESS'] = f"{new_progress}%"
-                
-                if new_progress == 100:
-                    df.loc[df['TASK_ID'] == selected_task, 'STATUS'] = 'Complete'
-                elif new_progress > 0:
-                    df.loc[df['TASK_ID'] == selected_task, 'STATUS'] = 'In Progress'
-                
-                if save_data(df):
-                    st.success(f"Updated {selected_task} to {new_progress}%!")
-                    st.cache_data.clear()
-                    st.rerun()
-        
-        if role in ["Project Manager", "Purchaser", "Assistant"]:
-            st.markdown("---")
-            st.markdown("### Update Actual Cost")
-            
-            col1, col2 = st.columns([2, 1])
-            
-            with col1:
-                cost_task = st.selectbox(
-                    "Select Task for Cost",
-                    df['TASK_ID'].tolist(),
-                    format_func=lambda x: f"{x} - {df[df['TASK_ID']==x]['TASK_NAME'].values[0]}",
-                    key="cost_task"
-                )
-            
-            with col2:
-                new_cost = st.number_input("Actual Cost ($)", min_value=0, step=1000)
-            
-            if st.button("Update Cost", type="primary"):
-                df.loc[df['TASK_ID'] == cost_task, 'ACTUAL_COST'] = new_cost
-                
-                if save_data(df):
-                    st.success(f"Updated cost for {cost_task}!")
-                    st.cache_data.clear()
-                    st.rerun()
+        update_tab(df, role)
     
     with tab3:
         st.markdown("### All Tasks")
@@ -394,60 +561,29 @@ def main():
         display_cols = ['PROJECT', 'TASK_ID', 'TASK_NAME', 'TYPE', 'ASSIGNED_TO', 
                        'START_DATE', 'END_DATE', 'PROGRESS', 'STATUS', 'PRIORITY', 'BUDGET', 'ACTUAL_COST']
         
+        # Send only the current page of rows to the browser
+        n_pages = max(1, -(-len(df) // TASKS_PAGE_SIZE))
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1)
+        start = (page - 1) * TASKS_PAGE_SIZE
+        st.caption(f"Page {page} of {n_pages} ({len(df)} tasks)")
+        
         st.dataframe(
-            df[display_cols],
+            df[display_cols].iloc[start:start + TASKS_PAGE_SIZE],
             use_container_width=True,
             height=600,
             hide_index=True
         )
         
         # Export button
-        csv = df.to_csv(index=False)
         st.download_button(
             label="📥 Download as CSV",
-            data=csv,
+            data=to_csv_bytes(df),
             file_name=f"project_data_{datetime.now().strftime('%Y%m%d')}.csv",
             mime="text/csv"
         )
     
     with tab4:
-        if role in ["Project Manager", "Assistant"]:
-            st.markdown("### Weekly Report")
-            
-            if st.button("Generate Report", type="primary"):
-                report = f"""
-# Weekly Project Report
-**Generated:** {datetime.now().strftime('%d/%m/%Y %H:%M')}
-
-## Villa 5
-- **Progress:** {villa5['PROGRESS_NUM'].mean():.1f}%
-- **Completed:** {len(villa5[villa5['STATUS']=='Complete'])} tasks
-- **In Progress:** {len(villa5[villa5['STATUS']=='In Progress'])} tasks
-- **Budget:** ${villa5['BUDGET'].sum():,.0f}
-- **Spent:** ${villa5['ACTUAL_COST'].sum():,.0f}
-
-## Villa 6
-- **Progress:** {villa6['PROGRESS_NUM'].mean():.1f}%
-- **Completed:** {len(villa6[villa6['STATUS']=='Complete'])} tasks
-- **In Progress:** {len(villa6[villa6['STATUS']=='In Progress'])} tasks
-- **Budget:** ${villa6['BUDGET'].sum():,.0f}
-- **Spent:** ${villa6['ACTUAL_COST'].sum():,.0f}
-
-## Critical Tasks
-"""
-                critical = df[(df['PRIORITY'].isin(['Critical', 'High'])) & (df['STATUS'] != 'Complete')]
-                for _, task in critical.iterrows():
-                    report += f"- **{task['PROJECT']}:** {task['TASK_NAME']} ({task['PROGRESS']})\n"
-                
-                st.markdown(report)
-                
-                # Download report
-                st.download_button(
-                    "📥 Download Report",
-                    report,
-                    file_name=f"weekly_report_{datetime.now().strftime('%Y%m%d')}.md",
-                    mime="text/markdown"
-                )
+        report_tab(df, role, villa_agg, villa_status)
 
 if __name__ == "__main__":
     main()